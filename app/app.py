@@ -1,33 +1,49 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
+import gc
 import os
+import string
 import sys
-import time
 from pathlib import Path
 from audio_recorder_streamlit import audio_recorder
 
 # --- CONFIGURACIÓN DE RUTAS ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src import config
-from src.data_utils import limpiar_texto_medico
 from src.manchester import calcular_prioridad
 from src.derivacion import calcular_derivacion
-from src.voice_recognition import transcribe_audio, append_text
+from src.inferencia_lineal import extraer_parametros_lineales, comprobar_paridad
+from src.predict import triage_batch
+from src.voice_recognition import (
+    transcribe_audio,
+    transcribe_audio_stream,
+    streaming_disponible,
+    load_whisper_model,
+    marcar_whisper_no_disponible,
+    append_text
+)
 
 # --- FUNCIONES AUXILIARES DE TEMPLATES ---
 TEMPLATES_DIR = Path(__file__).parent / "templates"
 ASSETS_DIR = Path(__file__).parent / "assets"
 
+@st.cache_data
 def load_template(filename: str) -> str:
-    """Carga un template HTML/CSS."""
+    """Carga un template HTML/CSS (se lee del disco una sola vez por proceso)."""
     try:
         with open(TEMPLATES_DIR / filename, 'r', encoding='utf-8') as f:
             return f.read()
     except FileNotFoundError:
         return f"<!-- Template {filename} no encontrado -->"
 
+@st.cache_resource
+def load_compiled_template(filename: str) -> string.Template:
+    """Compila un template HTML una sola vez (placeholders con formato $nombre)."""
+    return string.Template(load_template(filename))
+
+@st.cache_data
 def load_css() -> str:
     """Carga los estilos CSS."""
     return f"<style>\n{load_template('styles.css')}\n</style>"
@@ -44,22 +60,62 @@ st.set_page_config(
 st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- CARGA DE MODELOS ---
+# Frases de control para verificar la inferencia rápida contra predict_proba
+TEXTOS_PARIDAD = [
+    "dolor toracico intenso dificultad respirar",
+    "fiebre tos dolor garganta",
+    "dolor abdominal vomito diarrea",
+]
+
 @st.cache_resource
 def load_models():
     try:
-        if not os.path.exists(config.MODEL_SVM_PATH) or not os.path.exists(config.LABEL_ENCODER_PATH):
-            return None, None
-        with open(config.MODEL_SVM_PATH, 'rb') as f:
-            model = pickle.load(f)
-        with open(config.LABEL_ENCODER_PATH, 'rb') as f:
-            le = pickle.load(f)
-        return model, le
+        # mmap_mode='r' mapea los arrays de NumPy desde disco en lugar de copiarlos
+        model = joblib.load(config.MODEL_SVM_PATH, mmap_mode='r')
+        le = joblib.load(config.LABEL_ENCODER_PATH, mmap_mode='r')
+        # Liberar los buffers temporales de la deserialización
+        gc.collect()
+        # Clases precalculadas para indexar directamente (sin inverse_transform)
+        return model, le, le.classes_
+    except FileNotFoundError:
+        # Modelos sin entrenar: la interfaz muestra el aviso correspondiente
+        return None, None, None
     except Exception as e:
         st.error(f"Error técnico: {e}")
-        return None, None
+        return None, None, None
+
+
+@st.cache_resource
+def load_parametros_lineales(_model):
+    """
+    Extrae y cuantiza a int8 los coeficientes del SVM lineal del modelo cargado.
+    Se derivan siempre del propio modelo para que nunca queden desfasados.
+    """
+    try:
+        parametros = extraer_parametros_lineales(_model)
+    except Exception:
+        parametros = None
+    # Modelo con otra estructura o resultados distintos: se usará predict_proba del pipeline
+    if parametros is None or not comprobar_paridad(_model, parametros, TEXTOS_PARIDAD):
+        return None
+    return parametros
 
 
-model, le = load_models()
+@st.cache_data(ttl=600)
+def predecir_especialidad(texto: str, _model, _le, _parametros):
+    """Limpia el texto y predice la especialidad (cacheado por texto)."""
+    # 1. Limpiar y 2. Predecir, por el mismo camino que los lotes
+    return triage_batch([texto], _model, _le, _parametros)[0]
+
+
+@st.cache_resource(show_spinner="Cargando modelo de reconocimiento de voz...")
+def load_whisper():
+    """Carga (y descarga la primera vez) el modelo de faster-whisper una sola vez por proceso."""
+    return load_whisper_model()
+
+
+model, le, classes_ = load_models()
+parametros_lineales = load_parametros_lineales(model) if model else None
 
 # --- INTERFAZ ---
 
@@ -90,172 +146,211 @@ if not model:
         "**Atención:** Debes entrenar el modelo antes de usar la app. Ejecuta `python src/train.py` en tu terminal.")
     st.stop()
 
-# Área de entrada de texto
-col_input, col_help = st.columns([3, 2])
+# --- RESULTADOS ---
+def render_results(texto_input, model, le, classes_, parametros_lineales):
+    """Analiza el texto y muestra especialidad, triaje, derivación y otras posibilidades."""
+    # Procesamiento
+    with st.spinner('Analizando terminología clínica...'):
+        # 1. Limpiar y 2. Predecir
+        prediccion = predecir_especialidad(texto_input, model, le, parametros_lineales)
+        # 3. Prioridad (Manchester)
+        triaje = calcular_prioridad(texto_input)
+
+        pred_probs = prediccion['probabilidades']
+        confidence = prediccion['confianza']
+        especialidad_pred = prediccion['especialidad']
+
+    # --- SECCIÓN DE RESULTADOS ---
+    st.divider()
+    st.subheader(" Resultados del Análisis")
+
+    # Columnas para métricas
+    col_res_1, col_res_3 = st.columns([2, 2])
+
+    with col_res_1:
+        # Tarjeta de Diagnóstico
+        if confidence > 0.8:
+            st.success(f"### {especialidad_pred}")
+            st.caption("Nivel de certeza: Alto")
+        elif confidence > 0.5:
+            st.warning(f"### {especialidad_pred}")
+            st.caption("Nivel de certeza: Medio (Revisar)")
+        else:
+            st.error(f"### {especialidad_pred}")
+            st.caption("Nivel de certeza: Bajo (Requiere valoración humana)")
+
+    with col_res_3:
+        # Renderizar tarjeta de triaje desde template
+        html = load_compiled_template("triaje_card.html").substitute(
+            nivel=triaje['nivel'],
+            nombre=triaje['nombre'],
+            color=triaje['color'],
+            tiempo=triaje['tiempo']
+        )
+        st.markdown(html, unsafe_allow_html=True)
+
+    st.divider()
+    # Calculo de Derivación
+    derivacion = calcular_derivacion(triaje['nivel'], especialidad_pred)
+
+    # --- TARJETA DE DERIVACIÓN ---
+    st.subheader("Ruta de Derivación Sugerida")
 
-with col_input:
-    # Estado para el texto
-    if 'texto_completo' not in st.session_state:
-        st.session_state.texto_completo = ""
+    with st.container(border=True):
+        col_icon, col_text = st.columns([1, 5])
+
+        with col_icon:
+            # Icono grande centrado desde template
+            icon_html = load_compiled_template("icon_centered.html").substitute(
+                icon=derivacion['icono'], size="3rem"
+            )
+            st.markdown(icon_html, unsafe_allow_html=True)
+
+        with col_text:
+            st.markdown(f"### {derivacion['tipo']}")
+            st.markdown(f"**ACCIÓN:** {derivacion['accion']}")
+            st.info(derivacion['mensaje'])
+
+    st.divider()
+    # Gráfico de barras simple con las top 3 probabilidades
+    st.subheader("Otras posibilidades")
+    # Top-k sin ordenar todo el vector: argpartition (O(n)) y luego ordenar solo k elementos
+    k = min(3, len(pred_probs))
+    top_k_idx = np.argpartition(pred_probs, -k)[-k:]
+    top3_idx = top_k_idx[np.argsort(pred_probs[top_k_idx])[::-1]]
+
+    # Preparamos datos para gráfico
+    chart_data = pd.DataFrame({
+        "Especialidad": classes_[top3_idx],
+        "Probabilidad": pred_probs[top3_idx]
+    })
+
+    st.bar_chart(chart_data, x="Especialidad", y="Probabilidad", color="#008080")
+
+
+# --- PANEL DE ENTRADA Y RESULTADOS ---
+# Fragmento: escribir, dictar, "Analizar" o "Limpiar todo" solo re-ejecutan este
+# bloque, sin volver a recorrer la carga de modelos, el CSS ni la barra lateral.
+@st.fragment
+def render_panel_principal(model, le, classes_, parametros_lineales):
+    """Entrada del caso (texto/voz), botones de acción y resultados del análisis."""
+    # Área de entrada de texto
+    col_input, col_help = st.columns([3, 2])
+
+    with col_input:
+        # Estado para el texto: fragmentos (dictados/ediciones) que se unen solo al mostrarlos
+        if 'texto_completo_parts' not in st.session_state:
+            st.session_state.texto_completo_parts = []
     
-    # Label con micrófono integrado
-    col_label, col_mic = st.columns([10, 1])
-    with col_label:
-        st.markdown("#### Descripción del Caso")
-    with col_mic:
-        # Componente de grabación de audio compacto
-        audio_bytes = audio_recorder(
-            text="",
-            recording_color="#e74c3c",
-            neutral_color="#3498db",
-            icon_name="microphone",
-            icon_size="2x"
-        )
+        # Label con micrófono integrado
+        col_label, col_mic = st.columns([10, 1])
+        with col_label:
+            st.markdown("#### Descripción del Caso")
+        with col_mic:
+            # Componente de grabación de audio compacto
+            audio_bytes = audio_recorder(
+                text="",
+                recording_color="#e74c3c",
+                neutral_color="#3498db",
+                icon_name="microphone",
+                icon_size="2x"
+            )
     
-    # Procesar el audio cuando esté disponible
-    if audio_bytes:
-        # Convertir audio a texto usando el módulo de voice_recognition
-        with st.spinner("Transcribiendo audio..."):
-            success, texto_transcrito, error_msg = transcribe_audio(audio_bytes)
+        # Procesar el audio cuando esté disponible
+        if audio_bytes:
+            # Convertir audio a texto usando el módulo de voice_recognition
+            with st.spinner("Transcribiendo audio..."):
+                # El modelo Whisper se carga solo al dictar; si falla (sin red,
+                # disco lleno...) se usa Google y no se vuelve a intentar
+                whisper_model = None
+                if streaming_disponible():
+                    try:
+                        whisper_model = load_whisper()
+                    except Exception:
+                        marcar_whisper_no_disponible()
+
+                if whisper_model is not None:
+                    # Mostrar las hipótesis parciales a medida que llegan
+                    parcial_placeholder = st.empty()
+                    texto_transcrito, error_msg = None, None
+                    try:
+                        for is_final, parcial in transcribe_audio_stream(audio_bytes, whisper_model):
+                            parcial_placeholder.markdown(f"*{parcial}*")
+                            if is_final:
+                                texto_transcrito = parcial
+                    except Exception as e:
+                        error_msg = f"Error procesando audio: {str(e)}"
+                    parcial_placeholder.empty()
+                
+                    success = bool(texto_transcrito)
+                    if not success and error_msg is None:
+                        error_msg = "No se pudo entender el audio. Intenta hablar más claro."
+                else:
+                    success, texto_transcrito, error_msg = transcribe_audio(audio_bytes)
             
-            if success:
-                # Agregar el texto transcrito usando la función del módulo
-                st.session_state.texto_completo = append_text(
-                    st.session_state.texto_completo, 
-                    texto_transcrito
-                )
-                st.success(f"Transcrito correctamente")
-            else:
-                # Mostrar el error apropiado
-                if "no se pudo entender" in error_msg.lower():
-                    st.warning(f"{error_msg}")
+                if success:
+                    # Agregar el texto transcrito usando la función del módulo
+                    append_text(st.session_state.texto_completo_parts, texto_transcrito)
+                    st.success(f"Transcrito correctamente")
                 else:
-                    st.error(f"{error_msg}")
+                    # Mostrar el error apropiado
+                    if "no se pudo entender" in error_msg.lower():
+                        st.warning(f"{error_msg}")
+                    else:
+                        st.error(f"{error_msg}")
     
-    # Área de texto editable
-    texto_input = st.text_area(
-        "Escribe o dicta los síntomas del paciente",
-        value=st.session_state.texto_completo,
-        placeholder="Ejemplo: Paciente con dolor abdominal intenso desde hace 2 horas, náuseas y vómitos...",
-        height=150,
-        label_visibility="collapsed"
-    )
+        # Área de texto editable
+        texto_completo = " ".join(st.session_state.texto_completo_parts)
+        texto_input = st.text_area(
+            "Escribe o dicta los síntomas del paciente",
+            value=texto_completo,
+            placeholder="Ejemplo: Paciente con dolor abdominal intenso desde hace 2 horas, náuseas y vómitos...",
+            height=150,
+            label_visibility="collapsed"
+        )
     
-    # Actualizar el estado si se edita manualmente
-    st.session_state.texto_completo = texto_input
-
-    # Botones de acción
-    col_btn_1, col_btn_2 = st.columns([2, 4])
-    with col_btn_1:
-        analizar = st.button("Analizar", type="primary", use_container_width=True)
-    with col_btn_2:
-        if st.button("Limpiar todo", type="secondary", use_container_width=True):
-            st.session_state.texto_completo = ""
-            st.rerun()
-            st.rerun()
-
-with col_help:
-    st.markdown("#### ❓ ¿Cómo describir los síntomas?")
-    st.markdown("""
-    **Escribiendo:**
-    - Sé lo más detallado posible
-    - Incluye duración, intensidad y factores asociados
+        # Actualizar el estado solo si se edita manualmente
+        if texto_input != texto_completo:
+            st.session_state.texto_completo_parts = [texto_input] if texto_input else []
+
+        # Botones de acción
+        col_btn_1, col_btn_2 = st.columns([2, 4])
+        with col_btn_1:
+            analizar = st.button("Analizar", type="primary", use_container_width=True)
+        with col_btn_2:
+            if st.button("Limpiar todo", type="secondary", use_container_width=True):
+                st.session_state.texto_completo_parts = []
+                st.rerun(scope="fragment")
+
+    with col_help:
+        st.markdown("#### ❓ ¿Cómo describir los síntomas?")
+        st.markdown("""
+        **Escribiendo:**
+        - Sé lo más detallado posible
+        - Incluye duración, intensidad y factores asociados
     
-    **🎤 Dictando por voz:**
-    1. Haz clic en el ícono del micrófono
-    2. Habla claramente describiendo los síntomas
-    3. El audio se detendrá automáticamente
-    4. El texto se transcribirá automáticamente
+        **🎤 Dictando por voz:**
+        1. Haz clic en el ícono del micrófono
+        2. Habla claramente describiendo los síntomas
+        3. El audio se detendrá automáticamente
+        4. El texto se transcribirá automáticamente
     
-    **Ejemplos:**
-    - "Dolor abdominal intenso desde hace 2 horas, náuseas y vómitos"
-    - "Fiebre alta de 39°C, tos seca y dificultad para respirar"
-    """)
+        **Ejemplos:**
+        - "Dolor abdominal intenso desde hace 2 horas, náuseas y vómitos"
+        - "Fiebre alta de 39°C, tos seca y dificultad para respirar"
+        """)
     
-    st.info("💡 **Tip**: Puedes combinar dictado y escritura. El audio se convierte a texto que puedes editar.")
-
-# Lógica de Análisis
-if analizar and texto_input:
-    if len(texto_input) < 10:
-        st.warning("La descripción es demasiado breve para un diagnóstico fiable.")
-    else:
-        # Procesamiento
-        with st.spinner('Analizando terminología clínica...'):
-            # 1. Limpiar
-            texto_limpio = limpiar_texto_medico(texto_input)
-            time.sleep(0.5)  # Pequeña pausa para UX
-
-            # 2. Predecir
-            pred_probs = model.predict_proba([texto_limpio])[0]
-            max_idx = np.argmax(pred_probs)
-            confidence = pred_probs[max_idx]
-            especialidad_pred = le.inverse_transform([max_idx])[0]
-
-        # --- SECCIÓN DE RESULTADOS ---
-        st.divider()
-        st.subheader(" Resultados del Análisis")
-
-        # Columnas para métricas
-        col_res_1, col_res_3 = st.columns([2, 2])
-
-        with col_res_1:
-            # Tarjeta de Diagnóstico
-            if confidence > 0.8:
-                st.success(f"### {especialidad_pred}")
-                st.caption("Nivel de certeza: Alto")
-            elif confidence > 0.5:
-                st.warning(f"### {especialidad_pred}")
-                st.caption("Nivel de certeza: Medio (Revisar)")
-            else:
-                st.error(f"### {especialidad_pred}")
-                st.caption("Nivel de certeza: Bajo (Requiere valoración humana)")
-
-        with col_res_3:
-            # 3. Cálculo de Prioridad (Manchester)
-            triaje = calcular_prioridad(texto_input)
-
-            # Renderizar tarjeta de triaje desde template
-            template = load_template("triaje_card.html")
-            html = template.format(
-                nivel=triaje['nivel'],
-                nombre=triaje['nombre'],
-                color=triaje['color'],
-                tiempo=triaje['tiempo']
-            )
-            st.markdown(html, unsafe_allow_html=True)
-
-        st.divider()
-        # Calculo de Derivación
-        derivacion = calcular_derivacion(triaje['nivel'], especialidad_pred)
-
-        # --- TARJETA DE DERIVACIÓN ---
-        st.subheader("Ruta de Derivación Sugerida")
-
-        with st.container(border=True):
-            col_icon, col_text = st.columns([1, 5])
-
-            with col_icon:
-                # Icono grande centrado desde template
-                icon_template = load_template("icon_centered.html")
-                st.markdown(icon_template.format(icon=derivacion['icono'], size="3rem"), unsafe_allow_html=True)
-
-            with col_text:
-                st.markdown(f"### {derivacion['tipo']}")
-                st.markdown(f"**ACCIÓN:** {derivacion['accion']}")
-                st.info(derivacion['mensaje'])
+        st.info("💡 **Tip**: Puedes combinar dictado y escritura. El audio se convierte a texto que puedes editar.")
 
-        st.divider()
-        # Gráfico de barras simple con las top 3 probabilidades
-        st.subheader("Otras posibilidades")
-        top3_idx = np.argsort(pred_probs)[-3:][::-1]
+    # Lógica de Análisis
+    if analizar and texto_input:
+        if len(texto_input) < 10:
+            st.warning("La descripción es demasiado breve para un diagnóstico fiable.")
+        else:
+            render_results(texto_input, model, le, classes_, parametros_lineales)
 
-        # Preparamos datos para gráfico
-        chart_data = pd.DataFrame({
-            "Especialidad": le.inverse_transform(top3_idx),
-            "Probabilidad": pred_probs[top3_idx]
-        })
+    elif analizar and not texto_input:
+        st.error("Por favor ingresa una descripción para comenzar.")
 
-        st.bar_chart(chart_data, x="Especialidad", y="Probabilidad", color="#008080")
 
-elif analizar and not texto_input:
-    st.error("Por favor ingresa una descripción para comenzar.")
\ No newline at end of file
+render_panel_principal(model, le, classes_, parametros_lineales)
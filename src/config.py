@@ -59,4 +59,8 @@ VOICE_ENERGY_THRESHOLD = 4000
 # Usar umbral dinámico
 VOICE_DYNAMIC_THRESHOLD = True
 # Duración de ajuste al ruido ambiental (segundos)
-VOICE_AMBIENT_DURATION = 0.5
\ No newline at end of file
+VOICE_AMBIENT_DURATION = 0.5
+# Motor de transcripción: "whisper" (streaming local con faster-whisper) o "google"
+VOICE_ENGINE = "whisper"
+# Tamaño del modelo de faster-whisper (tiny, base, small, medium...)
+VOICE_WHISPER_MODEL = "small"
\ No newline at end of file
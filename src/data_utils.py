@@ -1,5 +1,6 @@
 import spacy
 import re
+import functools
 import sys
 import os
 
@@ -15,6 +16,9 @@ except ImportError:
 # Variable global para el modelo (Patrón Singleton para no cargarlo mil veces)
 _nlp_model = None
 
+# Regex precompilada: todo lo que no sea letra (con tildes y ñ) o espacio
+_NO_ALFABETICO_RE = re.compile(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]')
+
 def load_spacy_model():
     """
     Carga el modelo de Spacy en memoria si no está cargado aún.
@@ -24,7 +28,9 @@ def load_spacy_model():
     if _nlp_model is None:
         try:
             # print("⏳ Cargando modelo Spacy 'es_core_news_sm'...")
-            _nlp_model = spacy.load("es_core_news_sm")
+            # disable=['parser', 'ner'] acelera el procesamiento ya que no necesitamos
+            # análisis sintáctico ni entidades (la lematización no depende de ellos)
+            _nlp_model = spacy.load("es_core_news_sm", disable=['parser', 'ner'])
             
             # --- CONFIGURACIÓN CRÍTICA ---
             # Evitamos que Spacy elimine palabras como 'no', 'sin', 'nunca'
@@ -38,6 +44,7 @@ def load_spacy_model():
             sys.exit(1)
     return _nlp_model
 
+@functools.lru_cache(maxsize=256)
 def limpiar_texto_medico(texto):
     """
     Función maestra de limpieza para texto clínico.
@@ -57,22 +64,19 @@ def limpiar_texto_medico(texto):
     
     # 1. Limpieza básica con Regex
     # Mantenemos letras (a-z), vocales con tilde y espacios. Borramos números y símbolos.
-    texto = re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ\s]', ' ', texto)
+    texto = _NO_ALFABETICO_RE.sub(' ', texto)
     
     # 2. Procesamiento con Spacy
-    # disable=['parser', 'ner'] acelera la carga ya que no necesitamos análisis sintáctico profundo aquí
     doc = nlp(texto.lower())
-    tokens_limpios = []
     
-    for token in doc:
-        # Filtros:
-        # - No es puntuación
-        # - No es stopword (las negaciones ya no son stopwords gracias a la config)
-        # - Longitud mayor a 1 (evita letras sueltas como "y", "o", "a")
-        if not token.is_punct and not token.is_stop and len(token.text) > 1:
-            tokens_limpios.append(token.lemma_)
-            
-    return " ".join(tokens_limpios)
+    # Filtros (en una sola pasada, sin lista intermedia):
+    # - No es puntuación
+    # - No es stopword (las negaciones ya no son stopwords gracias a la config)
+    # - Longitud mayor a 1 (evita letras sueltas como "y", "o", "a")
+    return " ".join(
+        token.lemma_ for token in doc
+        if not token.is_punct and not token.is_stop and len(token.text) > 1
+    )
 
 # Bloque de prueba
 if __name__ == "__main__":
@@ -1,3 +1,7 @@
+import functools
+
+
+@functools.lru_cache(maxsize=256)
 def calcular_derivacion(nivel_manchester, especialidad_predicha):
     """
     Determina el lugar de atención adecuado según la gravedad y especialidad.
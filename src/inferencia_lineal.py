@@ -0,0 +1,193 @@
+"""
+Inferencia rápida para el pipeline TF-IDF + LinearSVC calibrado.
+
+Extrae una sola vez los coeficientes de todos los clasificadores internos de
+CalibratedClassifierCV, los cuantiza a int8 con una escala por fila y calcula
+las decisiones con un kernel compilado con Numba sobre la matriz dispersa (CSR)
+que produce el vectorizador. Después aplica las sigmoides de calibración igual
+que sklearn.
+"""
+
+import numpy as np
+from scipy.special import expit
+
+try:
+    from numba import njit
+except ImportError:
+    # Sin Numba se usa el producto disperso de scipy
+    njit = None
+
+
+def _decision_csr(indptr, indices, data, coef_q_t, escala, intercept):
+    """
+    Decisión lineal por documento:
+    out[d, r] = escala[r] * sum(x[d, j] * coef_q_t[j, r]) + intercept[r].
+    coef_q_t (int8) está traspuesta (vocabulario x filas) para que cada palabra
+    del documento sume una fila contigua en memoria.
+    """
+    n_docs = indptr.shape[0] - 1
+    n_rows = coef_q_t.shape[1]
+    out = np.zeros((n_docs, n_rows), dtype=np.float32)
+    for d in range(n_docs):
+        for k in range(indptr[d], indptr[d + 1]):
+            j = indices[k]
+            v = data[k]
+            for r in range(n_rows):
+                out[d, r] += v * coef_q_t[j, r]
+        for r in range(n_rows):
+            out[d, r] = out[d, r] * escala[r] + intercept[r]
+    return out
+
+
+# Sin parallel=True: Streamlit llama al kernel desde varios hilos (uno por sesión)
+# y la capa de hilos "workqueue" de Numba aborta el proceso ante accesos concurrentes.
+# Además la App envía un solo documento, así que paralelizar no aportaba nada.
+# Sin cache=True: la caché en disco depende del nombre del módulo (falla al ejecutar
+# este archivo como script) y no se puede escribir en despliegues de solo lectura.
+if njit is not None:
+    _decision_csr_compilada = njit(fastmath=True)(_decision_csr)
+else:
+    _decision_csr_compilada = None
+
+
+def cuantizar_int8(coef_t):
+    """
+    Cuantiza los coeficientes (vocabulario x filas) a int8 con una escala por fila:
+    escala[r] = max(|coef[r]|) / 127 y coef_q[r] = round(coef[r] / escala[r]).
+    """
+    escala = np.abs(coef_t).max(axis=0) / 127.0
+    # Filas con todos los coeficientes a 0: evitar la división por cero
+    escala[escala == 0] = 1.0
+    coef_q_t = np.round(coef_t / escala).astype(np.int8)
+    return np.ascontiguousarray(coef_q_t), escala.astype(np.float32)
+
+
+def extraer_parametros_lineales(pipeline):
+    """
+    Prepara los parámetros del modelo para la inferencia rápida.
+
+    Retorna un diccionario con los coeficientes (int8) apilados de todos los
+    folds, o None si el pipeline no es un LinearSVC calibrado (por ejemplo,
+    un modelo antiguo con SVC), en cuyo caso se debe usar `predict_proba`
+    del pipeline.
+    """
+    calibrado = pipeline.steps[-1][1]
+    if not hasattr(calibrado, 'calibrated_classifiers_'):
+        return None
+
+    n_classes = len(calibrado.classes_)
+    coefs, intercepts, a, b, columnas, folds = [], [], [], [], [], []
+
+    for fold, clf in enumerate(calibrado.calibrated_classifiers_):
+        estimador = getattr(clf, 'estimator', None) or getattr(clf, 'base_estimator', None)
+        if not hasattr(estimador, 'coef_'):
+            return None
+
+        # Columna de salida de cada fila de coef_ (igual que _CalibratedClassifier)
+        pos_class_indices = np.searchsorted(clf.classes, estimador.classes_)
+        if n_classes == 2:
+            pos_class_indices = pos_class_indices[1:]
+
+        for fila, (columna, calibrador) in enumerate(zip(pos_class_indices, clf.calibrators)):
+            coefs.append(estimador.coef_[fila])
+            intercepts.append(estimador.intercept_[fila])
+            a.append(calibrador.a_)
+            b.append(calibrador.b_)
+            columnas.append(columna)
+            folds.append(fold)
+
+    coef_q_t, escala = cuantizar_int8(np.vstack(coefs).T)
+    return {
+        'coef_q_t': coef_q_t,
+        'escala': escala,
+        'intercept': np.asarray(intercepts, dtype=np.float32),
+        'a': np.asarray(a, dtype=np.float32),
+        'b': np.asarray(b, dtype=np.float32),
+        'columnas': np.asarray(columnas, dtype=np.intp),
+        'folds': np.asarray(folds, dtype=np.intp),
+        'n_folds': len(calibrado.calibrated_classifiers_),
+        'n_classes': n_classes,
+    }
+
+
+def calcular_decision(parametros, X):
+    """Decisiones lineales (documentos x filas) para una matriz CSR."""
+    if _decision_csr_compilada is not None:
+        return _decision_csr_compilada(
+            X.indptr, X.indices, X.data.astype(np.float32),
+            parametros['coef_q_t'], parametros['escala'], parametros['intercept']
+        )
+    producto = np.asarray(X.astype(np.float32) @ parametros['coef_q_t'], dtype=np.float32)
+    return producto * parametros['escala'] + parametros['intercept']
+
+
+def predecir_proba_lineal(pipeline, parametros, textos_limpios):
+    """
+    Equivalente a `pipeline.predict_proba(textos_limpios)` usando el kernel compilado.
+    El pipeline solo se usa para vectorizar (TF-IDF).
+
+    Retorna: np.ndarray de forma (n_textos, n_clases)
+    """
+    X = pipeline[:-1].transform(textos_limpios).tocsr()
+    decision = calcular_decision(parametros, X)
+
+    # Calibración sigmoide (Platt) de cada fila, como _SigmoidCalibration
+    proba_filas = expit(-(parametros['a'] * decision + parametros['b']))
+
+    n_docs, n_classes = decision.shape[0], parametros['n_classes']
+    proba = np.zeros((parametros['n_folds'], n_docs, n_classes))
+    proba[parametros['folds'], :, parametros['columnas']] = proba_filas.T
+
+    if n_classes == 2:
+        proba[:, :, 0] = 1.0 - proba[:, :, 1]
+    else:
+        # Normalizar; si todas son 0 se reparte uniformemente
+        denominador = proba.sum(axis=2, keepdims=True)
+        uniforme = np.full_like(proba, 1.0 / n_classes)
+        proba = np.divide(proba, denominador, out=uniforme, where=denominador != 0)
+
+    proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+    # Promedio de los clasificadores calibrados de cada fold
+    return proba.mean(axis=0)
+
+
+def comprobar_paridad(pipeline, parametros, textos, atol=1e-2):
+    """
+    Verifica que la inferencia rápida coincide con `pipeline.predict_proba`
+    (misma clase ganadora y probabilidades dentro de `atol`).
+    """
+    rapida = predecir_proba_lineal(pipeline, parametros, textos)
+    referencia = pipeline.predict_proba(textos)
+    return (
+        rapida.shape == referencia.shape
+        and np.array_equal(rapida.argmax(axis=1), referencia.argmax(axis=1))
+        and np.allclose(rapida, referencia, atol=atol)
+    )
+
+# Bloque de prueba: paridad con sklearn en un pipeline sintético
+if __name__ == "__main__":
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import LinearSVC
+
+    rng = np.random.default_rng(42)
+    vocabulario = [f"palabra{i}" for i in range(200)]
+    for n_clases in (2, 5):
+        # Cada clase favorece su propio bloque de palabras para que haya señal
+        y = rng.integers(0, n_clases, 300)
+        X = [
+            " ".join(rng.choice(vocabulario[c * 20:(c + 1) * 20], 10))
+            + " " + " ".join(rng.choice(vocabulario, 10))
+            for c in y
+        ]
+        pipeline = Pipeline([
+            ('tfidf', TfidfVectorizer()),
+            ('svm', CalibratedClassifierCV(LinearSVC(), method='sigmoid', cv=3))
+        ]).fit(X, y)
+        parametros = extraer_parametros_lineales(pipeline)
+        diferencia = np.abs(
+            predecir_proba_lineal(pipeline, parametros, X) - pipeline.predict_proba(X)
+        ).max()
+        print(f"{n_clases} clases -> diferencia máxima: {diferencia:.2e}, "
+              f"paridad: {comprobar_paridad(pipeline, parametros, X)}")
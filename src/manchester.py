@@ -1,4 +1,5 @@
 import re
+import functools
 from src.data_utils import limpiar_texto_medico
 
 # Definición del Sistema de Triaje Manchester (Adaptado a Texto)
@@ -65,6 +66,7 @@ MANCHESTER_RULES = [
     }
 ]
 
+@functools.lru_cache(maxsize=256)
 def calcular_prioridad(texto):
     """
     Analiza el texto y determina el nivel de triaje Manchester.
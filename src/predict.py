@@ -1,13 +1,15 @@
 import os
 import sys
-import pickle
+import joblib
 import numpy as np
+from joblib import Parallel, delayed
 
 # Truco para importar módulos hermanos si se ejecuta como script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src import config
-from src.data_utils import limpiar_texto_medico
+from src.data_utils import limpiar_texto_medico, load_spacy_model
+from src.inferencia_lineal import predecir_proba_lineal
 
 def load_artifacts():
     """Carga el modelo y el codificador de etiquetas."""
@@ -15,11 +17,8 @@ def load_artifacts():
         raise FileNotFoundError("❌ No se encuentran los modelos. Ejecuta 'python src/train.py' primero.")
     
     print("⏳ Cargando cerebro (modelo)...")
-    with open(config.MODEL_SVM_PATH, 'rb') as f:
-        model = pickle.load(f)
-        
-    with open(config.LABEL_ENCODER_PATH, 'rb') as f:
-        le = pickle.load(f)
+    model = joblib.load(config.MODEL_SVM_PATH, mmap_mode='r')
+    le = joblib.load(config.LABEL_ENCODER_PATH, mmap_mode='r')
         
     return model, le
 
@@ -43,10 +42,53 @@ def predict_single(text, model, le):
     confidence = pred_probs[0][max_idx]
     
     # 4. Decodificar el número a nombre (0 -> 'CARDIOLOGÍA')
-    specialty = le.inverse_transform([max_idx])[0]
+    specialty = le.classes_[max_idx]
     
     return specialty, confidence, text_clean
 
+def triage_batch(texts, model, le, parametros=None):
+    """
+    Clasifica varios textos con una sola llamada al modelo.
+    Si se pasan los parámetros lineales (int8) se usa el kernel compilado.
+    Retorna: lista de diccionarios con especialidad, confianza,
+    probabilidades y texto_procesado (en el mismo orden que `texts`).
+    """
+    if not texts:
+        return []
+
+    # 1. Limpieza (en paralelo con hilos si hay varios textos)
+    if len(texts) == 1:
+        textos_limpios = [limpiar_texto_medico(texts[0])]
+    else:
+        # Cargar Spacy antes de lanzar los hilos: el singleton no tiene lock y
+        # varios hilos podrían llamar a spacy.load a la vez
+        load_spacy_model()
+        textos_limpios = Parallel(n_jobs=-1, prefer='threads')(
+            delayed(limpiar_texto_medico)(t) for t in texts
+        )
+
+    # 2. Predicción en bloque
+    if parametros is not None:
+        pred_probs = predecir_proba_lineal(model, parametros, textos_limpios)
+    else:
+        pred_probs = model.predict_proba(textos_limpios)
+
+    # 3. Decodificar todas las clases de una vez (indexando classes_ directamente)
+    max_idx = pred_probs.argmax(axis=1)
+    confianzas = pred_probs[np.arange(len(texts)), max_idx]
+    especialidades = le.classes_[max_idx]
+
+    return [
+        {
+            "especialidad": especialidad,
+            "confianza": confianza,
+            "probabilidades": probs,
+            "texto_procesado": texto_limpio
+        }
+        for especialidad, confianza, probs, texto_limpio
+        in zip(especialidades, confianzas, pred_probs, textos_limpios)
+    ]
+
 def interactive_mode():
     """Bucle infinito para probar frases en la consola."""
     try:
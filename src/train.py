@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
 import os
 import sys
 
@@ -9,7 +9,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import SVC
+from sklearn.svm import LinearSVC
+from sklearn.calibration import CalibratedClassifierCV
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score
@@ -62,8 +63,8 @@ def train():
     y = le.fit_transform(y_labels)
     
     # Guardar LabelEncoder (CRÍTICO para la App)
-    with open(config.LABEL_ENCODER_PATH, 'wb') as f:
-        pickle.dump(le, f)
+    # compress=0 para poder cargarlo con mmap_mode='r' en la App
+    joblib.dump(le, config.LABEL_ENCODER_PATH, compress=0)
     print(f"💾 LabelEncoder actualizado y guardado en {config.LABEL_ENCODER_PATH}")
     
     # 4. Split (Train/Test)
@@ -83,12 +84,17 @@ def train():
             max_features=config.VOCAB_SIZE,
             strip_accents='unicode'
         )),
-        ('svm', SVC(
-            C=10, 
-            kernel='linear', 
-            class_weight='balanced', 
-            probability=True,  # Necesario para mostrar % de confianza
-            random_state=config.RANDOM_STATE
+        # SVM lineal: predecir es un único producto disperso con coef_ (sin vectores de soporte).
+        # La calibración sigmoide (Platt) da el % de confianza que muestra la App.
+        ('svm', CalibratedClassifierCV(
+            LinearSVC(
+                C=10, 
+                class_weight='balanced', 
+                dual=True,
+                random_state=config.RANDOM_STATE
+            ),
+            method='sigmoid',
+            cv=3
         ))
     ])
 
@@ -103,8 +109,7 @@ def train():
     print(f"🏆 Precisión en Test: {acc*100:.2f}%")
     
     # 8. Guardar Modelo Final
-    with open(config.MODEL_SVM_PATH, 'wb') as f:
-        pickle.dump(pipeline, f)
+    joblib.dump(pipeline, config.MODEL_SVM_PATH, compress=0)
     print(f"✅ Modelo guardado exitosamente en: {config.MODEL_SVM_PATH}")
 
 if __name__ == "__main__":
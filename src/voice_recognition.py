@@ -1,18 +1,21 @@
 """
 Módulo de reconocimiento de voz para el sistema de triaje médico.
-Maneja la transcripción de audio a texto usando Google Speech Recognition.
+Maneja la transcripción de audio a texto usando faster-whisper en streaming
+o Google Speech Recognition como alternativa.
 """
 
 import speech_recognition as sr
-import os
-from typing import Optional, Tuple
+import io
+from typing import Iterator, List, Optional, Tuple
 
 try:
     from src.config import (
         VOICE_LANGUAGE, 
         VOICE_ENERGY_THRESHOLD, 
         VOICE_DYNAMIC_THRESHOLD,
-        VOICE_AMBIENT_DURATION
+        VOICE_AMBIENT_DURATION,
+        VOICE_ENGINE,
+        VOICE_WHISPER_MODEL
     )
 except ImportError:
     # Valores por defecto si no se puede importar config
@@ -20,6 +23,95 @@ except ImportError:
     VOICE_ENERGY_THRESHOLD = 4000
     VOICE_DYNAMIC_THRESHOLD = True
     VOICE_AMBIENT_DURATION = 0.5
+    VOICE_ENGINE = "whisper"
+    VOICE_WHISPER_MODEL = "small"
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    # Sin faster-whisper se usa siempre Google Speech Recognition
+    WhisperModel = None
+
+# Variable global para el reconocedor (Patrón Singleton, igual que Spacy)
+_recognizer = None
+
+# Se pone a False si el modelo Whisper no se pudo cargar (sin red, disco lleno...)
+_whisper_disponible = True
+
+
+def load_recognizer():
+    """
+    Crea el reconocedor de Google Speech Recognition una sola vez
+    y lo configura para mejorar la precisión.
+    """
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = sr.Recognizer()
+        _recognizer.energy_threshold = VOICE_ENERGY_THRESHOLD
+        _recognizer.dynamic_energy_threshold = VOICE_DYNAMIC_THRESHOLD
+    return _recognizer
+
+
+def load_whisper_model():
+    """
+    Crea el modelo de faster-whisper (lo descarga la primera vez).
+    Usa cuantización int8 para acelerar la inferencia en CPU.
+    La App lo cachea con st.cache_resource para cargarlo una sola vez.
+    """
+    return WhisperModel(VOICE_WHISPER_MODEL, device="cpu", compute_type="int8")
+
+
+def streaming_disponible() -> bool:
+    """
+    Indica si se puede usar la transcripción en streaming con faster-whisper.
+    
+    Returns:
+        bool: True si el motor configurado es Whisper, la librería está instalada
+        y el modelo no ha fallado al cargarse
+    """
+    return VOICE_ENGINE == "whisper" and WhisperModel is not None and _whisper_disponible
+
+
+def marcar_whisper_no_disponible() -> None:
+    """
+    Desactiva la transcripción con Whisper para el resto del proceso
+    (por ejemplo, si falla la descarga del modelo); se usará Google.
+    """
+    global _whisper_disponible
+    _whisper_disponible = False
+
+
+def transcribe_audio_stream(audio_bytes: bytes, model, language: str = None) -> Iterator[Tuple[bool, str]]:
+    """
+    Transcribe audio a texto en streaming usando faster-whisper.
+    
+    El clip se transcribe una sola vez; faster-whisper devuelve los segmentos
+    de forma perezosa, así que el texto parcial se emite a medida que se
+    decodifica cada segmento.
+    
+    Args:
+        audio_bytes: Bytes del archivo de audio WAV
+        model: Modelo de faster-whisper (ver load_whisper_model)
+        language: Código de idioma para la transcripción (default: desde config)
+    
+    Yields:
+        Tuple[bool, str]:
+            - is_final: True solo para el texto completo
+            - text: Texto transcrito hasta el momento
+    """
+    if language is None:
+        language = VOICE_LANGUAGE
+    
+    # Whisper usa códigos ISO 639-1 ("es" en lugar de "es-ES")
+    idioma = language.split("-")[0]
+    segments, _ = model.transcribe(io.BytesIO(audio_bytes), language=idioma, beam_size=1)
+    
+    partes: List[str] = []
+    for segment in segments:
+        partes.append(segment.text.strip())
+        yield False, " ".join(partes)
+    
+    yield True, " ".join(partes)
 
 
 def transcribe_audio(audio_bytes: bytes, language: str = None) -> Tuple[bool, Optional[str], Optional[str]]:
@@ -39,71 +131,48 @@ def transcribe_audio(audio_bytes: bytes, language: str = None) -> Tuple[bool, Op
     if language is None:
         language = VOICE_LANGUAGE
     
-    temp_file = "temp_audio.wav"
-    
     try:
-        # Guardar el audio temporalmente
-        with open(temp_file, "wb") as f:
-            f.write(audio_bytes)
+        # Reutilizar el reconocedor ya configurado
+        recognizer = load_recognizer()
         
-        # Inicializar el reconocedor
-        recognizer = sr.Recognizer()
-        
-        # Configuración para mejorar la precisión
-        recognizer.energy_threshold = VOICE_ENERGY_THRESHOLD
-        recognizer.dynamic_energy_threshold = VOICE_DYNAMIC_THRESHOLD
-        
-        # Cargar y procesar el audio
-        with sr.AudioFile(temp_file) as source:
-            # Ajustar al ruido ambiental
-            recognizer.adjust_for_ambient_noise(source, duration=VOICE_AMBIENT_DURATION)
+        # Cargar y procesar el audio directamente desde memoria (sin archivo temporal)
+        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+            # Con umbral dinámico el reconocedor se adapta solo al ruido,
+            # así que solo calibramos cuando el umbral es fijo
+            if not recognizer.dynamic_energy_threshold:
+                recognizer.adjust_for_ambient_noise(source, duration=VOICE_AMBIENT_DURATION)
             # Grabar el audio
             audio_data = recognizer.record(source)
         
         # Intentar transcribir
         try:
             texto_transcrito = recognizer.recognize_google(audio_data, language=language)
-            cleanup_temp_file(temp_file)
             return True, texto_transcrito, None
             
         except sr.UnknownValueError:
-            cleanup_temp_file(temp_file)
             return False, None, "No se pudo entender el audio. Intenta hablar más claro."
             
         except sr.RequestError as e:
-            cleanup_temp_file(temp_file)
             return False, None, f"Error del servicio de reconocimiento: {str(e)}"
     
     except Exception as e:
-        cleanup_temp_file(temp_file)
         return False, None, f"Error procesando audio: {str(e)}"
 
 
-def cleanup_temp_file(filepath: str) -> None:
+def append_text(text_parts: List[str], new_text: str) -> List[str]:
     """
-    Elimina un archivo temporal de forma segura.
+    Agrega nuevo texto transcrito a la lista de fragmentos del caso.
     
-    Args:
-        filepath: Ruta del archivo a eliminar
-    """
-    try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-    except Exception:
-        pass  # Ignorar errores al eliminar archivos temporales
-
-
-def append_text(current_text: str, new_text: str) -> str:
-    """
-    Agrega nuevo texto transcrito al texto existente.
+    Se guardan fragmentos en lugar de concatenar en cada dictado, así el
+    texto completo se arma una sola vez con " ".join() al mostrarlo.
     
     Args:
-        current_text: Texto actual
+        text_parts: Fragmentos de texto actuales (se modifica en el sitio)
         new_text: Nuevo texto a agregar
     
     Returns:
-        str: Texto combinado con espaciado correcto
+        List[str]: La misma lista de fragmentos
     """
-    if not current_text or current_text.strip() == "":
-        return new_text
-    return f"{current_text} {new_text}"
+    if new_text:
+        text_parts.append(new_text)
+    return text_parts